@@ -1,4 +1,5 @@
 import os
+import sys
 from typing import List
 from dotenv import load_dotenv
 
@@ -10,6 +11,10 @@ HOST = os.environ.get("HOST", "0.0.0.0")
 PORT = int(os.environ.get("PORT", "8000"))
 DEBUG = os.environ.get("DEBUG", "True").lower() in ["true", "1", "t", "yes"]
 
+# Uvicorn event loop and HTTP parser (uvloop is not available on Windows)
+UVICORN_LOOP = "asyncio" if sys.platform == "win32" else "uvloop"
+UVICORN_HTTP = "httptools"
+
 # API Configuration
 APP_TITLE = "Local AI Search Assistant"
 APP_DESCRIPTION = "Backend API for search and LLM integration"
@@ -32,12 +37,24 @@ OLLAMA_API_URL = ollama_url
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3:8b")
 OLLAMA_TIMEOUT = int(os.environ.get("OLLAMA_TIMEOUT", "180"))  # 3 minutes timeout
 OLLAMA_MAX_TOKENS = int(os.environ.get("OLLAMA_MAX_TOKENS", "2048"))  # Maximum tokens to generate
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")  # How long Ollama keeps the model loaded
+OLLAMA_UDS_PATH = os.environ.get("OLLAMA_UDS_PATH") or None  # Unix socket to reach Ollama through (e.g. behind a local proxy)
+
+# Answer cache Configuration
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "True").lower() in ["true", "1", "t", "yes"]
+ANSWER_CACHE_DIR = os.environ.get("ANSWER_CACHE_DIR", "./cache")
+ANSWER_CACHE_MODEL = os.environ.get("ANSWER_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))  # Minimum cosine similarity for a hit
+ANSWER_CACHE_TTL = int(os.environ.get("ANSWER_CACHE_TTL", str(7 * 24 * 60 * 60)))  # Seconds before a cached answer expires (7 days)
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "10000"))  # Oldest answers are dropped beyond this
 
 # Create a settings class for compatibility
 class Settings:
     HOST = HOST
     PORT = PORT
     DEBUG = DEBUG
+    UVICORN_LOOP = UVICORN_LOOP
+    UVICORN_HTTP = UVICORN_HTTP
     APP_TITLE = APP_TITLE
     APP_DESCRIPTION = APP_DESCRIPTION
     APP_VERSION = APP_VERSION
@@ -48,6 +65,14 @@ class Settings:
     OLLAMA_MODEL = OLLAMA_MODEL
     OLLAMA_TIMEOUT = OLLAMA_TIMEOUT
     OLLAMA_MAX_TOKENS = OLLAMA_MAX_TOKENS
+    OLLAMA_KEEP_ALIVE = OLLAMA_KEEP_ALIVE
+    OLLAMA_UDS_PATH = OLLAMA_UDS_PATH
+    ANSWER_CACHE_ENABLED = ANSWER_CACHE_ENABLED
+    ANSWER_CACHE_DIR = ANSWER_CACHE_DIR
+    ANSWER_CACHE_MODEL = ANSWER_CACHE_MODEL
+    ANSWER_CACHE_THRESHOLD = ANSWER_CACHE_THRESHOLD
+    ANSWER_CACHE_TTL = ANSWER_CACHE_TTL
+    ANSWER_CACHE_MAX_ENTRIES = ANSWER_CACHE_MAX_ENTRIES
 
 # Create a global settings object
 settings = Settings() 
\ No newline at end of file
@@ -0,0 +1,55 @@
+import httpx
+
+from config import settings
+
+# Connection pool sizing for the shared outbound clients
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
+# Ollama connections are local and long-lived, keep them open between generations
+OLLAMA_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32, keepalive_expiry=300)
+
+# Default timeout for outbound requests (individual calls may override it)
+HTTP_TIMEOUT = httpx.Timeout(5.0, connect=2.0)
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the shared client for remote HTTPS APIs (Serper.dev).
+
+    A single client is created per app (see the lifespan in main.py) so that
+    keep-alive connections and HTTP/2 sessions are reused across requests
+    instead of paying a new TCP/TLS handshake on every call.
+
+    Returns:
+        A pooled httpx.AsyncClient
+    """
+    return httpx.AsyncClient(
+        limits=HTTP_LIMITS,
+        http2=True,
+        timeout=HTTP_TIMEOUT
+    )
+
+def create_ollama_client() -> httpx.AsyncClient:
+    """
+    Create the shared client for the local Ollama API.
+
+    Ollama is served over plain HTTP, where httpx cannot negotiate HTTP/2
+    (it needs TLS ALPN), so this pool stays on HTTP/1.1 keep-alive and is
+    kept separate from the HTTP/2 client used for Serper.dev.
+
+    If settings.OLLAMA_UDS_PATH is set, connections go through that Unix
+    domain socket instead of TCP loopback; OLLAMA_API_URL then only
+    provides the Host header and base path.
+
+    Returns:
+        A pooled httpx.AsyncClient bound to settings.OLLAMA_API_URL
+    """
+    transport = None
+    if settings.OLLAMA_UDS_PATH:
+        transport = httpx.AsyncHTTPTransport(uds=settings.OLLAMA_UDS_PATH, limits=OLLAMA_LIMITS)
+
+    return httpx.AsyncClient(
+        base_url=settings.OLLAMA_API_URL,
+        limits=OLLAMA_LIMITS,
+        timeout=HTTP_TIMEOUT,
+        transport=transport
+    )
@@ -1,16 +1,54 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import logging
-from routes import router
+from routes import router, cleanup_active_streams, cleanup_cache
 from config import settings
+from http_clients import create_http_client, create_ollama_client
+from services import answer_cache
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
 logger = logging.getLogger("LocalAssistant")
 
-app = FastAPI(title="Local AI Search Assistant API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown."""
+    # Shared pooled HTTP clients: HTTP/2 for Serper.dev, HTTP/1.1 for local Ollama
+    client = create_http_client()
+    ollama_client = create_ollama_client()
+    app.state.http = client
+    app.state.ollama = ollama_client
+    
+    # Background tasks that expire old streams and cache entries and
+    # persist the answer cache index
+    cleanup_tasks = [
+        asyncio.create_task(cleanup_active_streams()),
+        asyncio.create_task(cleanup_cache()),
+        asyncio.create_task(answer_cache.persist_periodically())
+    ]
+    try:
+        yield
+    finally:
+        for task in cleanup_tasks:
+            task.cancel()
+        await asyncio.gather(*cleanup_tasks, return_exceptions=True)
+        await client.aclose()
+        await ollama_client.aclose()
+        await answer_cache.flush()
+
+app = FastAPI(
+    title="Local AI Search Assistant API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 # Add CORS middleware with proper configuration for EventSource
 app.add_middleware(
@@ -35,5 +73,7 @@ if __name__ == "__main__":
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        loop=settings.UVICORN_LOOP,
+        http=settings.UVICORN_HTTP
     ) 
\ No newline at end of file
@@ -2,10 +2,14 @@ from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional, List
 import uuid
 
+def new_id() -> str:
+    """Generate a new request ID."""
+    return uuid.uuid4().hex
+
 class SearchQuery(BaseModel):
     """Model for search queries."""
     query: str
-    request_id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
+    request_id: Optional[str] = Field(default_factory=new_id)
     
 class SearchResult(BaseModel):
     """Model for search results."""
@@ -19,7 +23,7 @@ class LLMRequest(BaseModel):
     """Model for LLM generation requests."""
     query: str
     search_results: Optional[Dict[str, Any]] = None
-    request_id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
+    request_id: Optional[str] = Field(default_factory=new_id)
     
 class LLMResponse(BaseModel):
     """Model for LLM generation responses."""
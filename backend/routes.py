@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, Depends,
 from fastapi.responses import StreamingResponse, JSONResponse
 from typing import Dict, Any, List, AsyncGenerator, Optional, Callable
 import httpx
-import json
+import orjson
 import asyncio
 from datetime import datetime
 import uuid
@@ -14,35 +14,56 @@ import traceback
 import asyncio
 import functools
 
-from models import SearchQuery, LLMRequest, SearchResult, HealthCheckResponse, APIError, LLMResponse
+from models import SearchQuery, LLMRequest, SearchResult, HealthCheckResponse, APIError, LLMResponse, new_id
 from services.search_service import search_serper
-from services.llm_service import generate_answer, generate_answer_streaming
+from services.llm_service import generate_answer, generate_answer_streaming, warm_ollama
+from services import answer_cache
 from config import settings
+from ttl_store import TTLStore
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-)
+# Logging is configured once in main.py
 logger = logging.getLogger("LocalAssistant")
 
 # Create router
 router = APIRouter()
 
 # In-memory cache for search results
-# Using a dict with query_id as key and search results as value
-search_cache = {}
+# Keyed by query_id, entries expire after 2 hours
+search_cache = TTLStore(ttl=2 * 60 * 60)
 
-# Active streams tracking
-active_streams = {}
+# Active streams tracking, entries expire after 15 minutes
+active_streams = TTLStore(ttl=15 * 60)
+
+# Pre-serialized request body for the Serper.dev health probe
+SERPER_PROBE_BODY = orjson.dumps({"q": "test", "gl": "us", "hl": "en"})
+
+# End of stream marker, identical for every stream
+DONE_FRAME = b"data: [DONE]\n\n"
+
+# ISO timestamp shared by all SSE frames emitted within the same second
+_ts_cache = ["", 0]
+
+def _sse_timestamp() -> str:
+    """Return the current ISO timestamp, re-formatted at most once per second."""
+    now = int(time.time())
+    if now != _ts_cache[1]:
+        _ts_cache[0] = datetime.fromtimestamp(now).isoformat()
+        _ts_cache[1] = now
+    return _ts_cache[0]
 
 # Maximum iterations for LLM generation
 MAX_LLM_ITERATIONS = 150  # Increased from 30 to 150
 
+# Maximum seconds generation waits for the model warm-up started alongside the search
+WARMUP_WAIT = 5.0
+
+# Maximum seconds generation waits for the answer cache prefetch before treating it as a miss
+CACHE_PREFETCH_WAIT = 1.0
+
 class StreamRequest(BaseModel):
     """Model for stream requests combining search and generation."""
     query: str
-    request_id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
+    request_id: Optional[str] = Field(default_factory=new_id)
     session_id: Optional[str] = None
     model: Optional[str] = None
     language: Optional[str] = "en"
@@ -58,83 +79,100 @@ async def root():
     """Root endpoint to verify the API is running."""
     return {"status": "online", "message": "Local AI Search Assistant API is running"}
 
-@router.get("/health")
-async def health_check():
-    """
-    Health check endpoint to verify all services are working.
-    Tests the connectivity to Ollama LLM API and Serper.dev search API.
-    """
-    logger.info("Health check requested")
-    request_id = str(uuid.uuid4())
-    logger.info(f"Health check request_id: {request_id}")
-    
+async def _probe_ollama(client: httpx.AsyncClient, request_id: str) -> Dict[str, Any]:
+    """Check the Ollama API and return its services-dict entry."""
     start_time = time.time()
-    services = {}
-    overall_status = "healthy"
-    
-    # Check Ollama API
     try:
-        logger.info(f"[{request_id}] Checking Ollama API")
-        api_url = settings.OLLAMA_API_URL
-        if not api_url.endswith("/api/tags"):
-            api_url = f"{api_url}/api/tags"
-            
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(api_url)
-            response.raise_for_status()
-            
-            # Check if the model is available
-            models = response.json().get("models", [])
-            model_available = any(m.get("name") == settings.OLLAMA_MODEL for m in models)
-            
-            services["ollama"] = {
-                "status": "healthy" if model_available else "degraded",
-                "detail": f"Model {settings.OLLAMA_MODEL} {'found' if model_available else 'not found'}",
-                "latency_ms": int((time.time() - start_time) * 1000)
-            }
-            
-            if not model_available:
-                overall_status = "degraded"
-                logger.warning(f"[{request_id}] Ollama model {settings.OLLAMA_MODEL} not found")
+        logger.info("[%s] Checking Ollama API", request_id)
+        response = await client.get("/api/tags")
+        response.raise_for_status()
+        
+        # Check if the model is available
+        models = orjson.loads(response.content).get("models", [])
+        model_available = any(m.get("name") == settings.OLLAMA_MODEL for m in models)
+        
+        if not model_available:
+            logger.warning("[%s] Ollama model %s not found", request_id, settings.OLLAMA_MODEL)
+        
+        return {
+            "status": "healthy" if model_available else "degraded",
+            "detail": f"Model {settings.OLLAMA_MODEL} {'found' if model_available else 'not found'}",
+            "latency_ms": int((time.time() - start_time) * 1000)
+        }
     except Exception as e:
-        logger.error(f"[{request_id}] Ollama API check failed: {str(e)}")
-        services["ollama"] = {
+        logger.error("[%s] Ollama API check failed: %s", request_id, e)
+        return {
             "status": "unhealthy",
             "detail": f"Error: {str(e)}",
             "latency_ms": int((time.time() - start_time) * 1000)
         }
-        overall_status = "unhealthy"
-    
-    # Check Serper.dev API
-    search_start_time = time.time()
+
+async def _probe_serper(client: httpx.AsyncClient, request_id: str) -> Dict[str, Any]:
+    """Check the Serper.dev API and return its services-dict entry."""
+    start_time = time.time()
     try:
-        logger.info(f"[{request_id}] Checking Serper.dev API")
+        logger.info("[%s] Checking Serper.dev API", request_id)
         headers = {
             "X-API-KEY": settings.SERPER_API_KEY,
             "Content-Type": "application/json"
         }
         
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.post(
-                settings.SERPER_API_URL,
-                headers=headers,
-                json={"q": "test", "gl": "us", "hl": "en"}
-            )
-            response.raise_for_status()
-            
-            services["search_api"] = {
-                "status": "healthy",
-                "detail": "Serper.dev API is responsive",
-                "latency_ms": int((time.time() - search_start_time) * 1000)
-            }
+        response = await client.post(
+            settings.SERPER_API_URL,
+            headers=headers,
+            content=SERPER_PROBE_BODY
+        )
+        response.raise_for_status()
+        
+        return {
+            "status": "healthy",
+            "detail": "Serper.dev API is responsive",
+            "latency_ms": int((time.time() - start_time) * 1000)
+        }
     except Exception as e:
-        logger.error(f"[{request_id}] Serper.dev API check failed: {str(e)}")
-        services["search_api"] = {
+        logger.error("[%s] Serper.dev API check failed: %s", request_id, e)
+        return {
             "status": "unhealthy",
             "detail": f"Error: {str(e)}",
-            "latency_ms": int((time.time() - search_start_time) * 1000)
+            "latency_ms": int((time.time() - start_time) * 1000)
         }
+
+@router.get("/health")
+async def health_check(request: Request):
+    """
+    Health check endpoint to verify all services are working.
+    Tests the connectivity to Ollama LLM API and Serper.dev search API.
+    Both probes run concurrently, so the check takes as long as the slower one.
+    """
+    logger.info("Health check requested")
+    request_id = str(uuid.uuid4())
+    logger.info("Health check request_id: %s", request_id)
+    
+    # Run the Ollama and Serper.dev checks concurrently
+    ollama_res, serper_res = await asyncio.gather(
+        _probe_ollama(request.app.state.ollama, request_id),
+        _probe_serper(request.app.state.http, request_id),
+        return_exceptions=True
+    )
+    
+    services = {}
+    for name, result in (("ollama", ollama_res), ("search_api", serper_res)):
+        if isinstance(result, BaseException):
+            logger.error("[%s] %s check failed: %s", request_id, name, result)
+            result = {
+                "status": "unhealthy",
+                "detail": f"Error: {str(result)}",
+                "latency_ms": 0
+            }
+        services[name] = result
+    
+    statuses = {entry["status"] for entry in services.values()}
+    if "unhealthy" in statuses:
         overall_status = "unhealthy"
+    elif "degraded" in statuses:
+        overall_status = "degraded"
+    else:
+        overall_status = "healthy"
     
     # Add cache status
     services["cache"] = {
@@ -149,36 +187,22 @@ async def health_check():
         timestamp=datetime.now().isoformat()
     )
     
-    logger.info(f"[{request_id}] Health check completed with status: {overall_status}")
+    logger.info("[%s] Health check completed with status: %s", request_id, overall_status)
     return response
 
 # Cleanup task to remove old entries from active_streams
 async def cleanup_active_streams():
     """
     Clean up active streams that are too old.
+    Sleeps until the oldest stream is due instead of polling.
     """
     while True:
         try:
-            await asyncio.sleep(60)  # Run every minute
-            now = time.time()
-            keys_to_remove = []
-            
-            for request_id, stream_data in active_streams.items():
-                # Remove streams older than 15 minutes
-                if now - stream_data["start_time"] > 15 * 60:
-                    keys_to_remove.append(request_id)
-            
-            for key in keys_to_remove:
-                del active_streams[key]
-                
-            logger.info(f"Cleaned up {len(keys_to_remove)} old streams. Active streams: {len(active_streams)}")
+            await active_streams.wait_for_expiry()
+            removed = active_streams.expire()
+            logger.info("Cleaned up %d old streams. Active streams: %d", removed, len(active_streams))
         except Exception as e:
-            logger.error(f"Error in cleanup_active_streams: {str(e)}")
-
-@router.on_event("startup")
-async def setup_cleanup():
-    """Set up background task to clean up active streams."""
-    asyncio.create_task(cleanup_active_streams())
+            logger.error("Error in cleanup_active_streams: %s", e)
 
 @router.options("/unified")
 async def options_unified():
@@ -191,59 +215,72 @@ async def options_unified():
     }
 
 @router.get("/unified")
+async def unified_get(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    query: str,
+    request_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    model: Optional[str] = None,
+    language: str = "en",
+    max_search_results: int = 5,
+    temperature: float = 0.7,
+    max_tokens: int = 4096,
+    top_p: float = 0.9,
+    top_k: int = 40,
+    timeout: int = 300
+):
+    """
+    Unified endpoint called with query parameters (e.g. from EventSource).
+    See _run_unified for the stream contents.
+    """
+    if not query:
+        raise HTTPException(status_code=400, detail="Query parameter is required")
+        
+    stream_request = StreamRequest(
+        query=query,
+        request_id=request_id or new_id(),
+        session_id=session_id,
+        model=model,
+        language=language,
+        max_search_results=max_search_results,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        top_p=top_p,
+        top_k=top_k,
+        timeout=timeout
+    )
+    return _run_unified(request, stream_request, background_tasks)
+
 @router.post("/unified")
-async def unified_endpoint(request: Request, stream_request: StreamRequest = None, background_tasks: BackgroundTasks = None):
+async def unified_post(request: Request, stream_request: StreamRequest, background_tasks: BackgroundTasks):
+    """
+    Unified endpoint called with a JSON body.
+    See _run_unified for the stream contents.
     """
-    Unified endpoint that handles the complete flow in one request:
+    return _run_unified(request, stream_request, background_tasks)
+
+def _run_unified(request: Request, stream_request: StreamRequest, background_tasks: BackgroundTasks) -> StreamingResponse:
+    """
+    Unified flow that handles the complete query in one request:
     1. Search the web
-    2. Stream search results to the client
+    2. Send the search results to the client in one event
     3. Generate LLM summary based on search results
     4. Stream the LLM response to the client
     
     All in a single SSE stream.
-    
-    Can be called either with:
-    - GET request with query parameters
-    - POST request with JSON body
     """
-    # If no StreamRequest was provided, try to get parameters from query
-    if stream_request is None:
-        query_params = request.query_params
-        query = query_params.get("query")
-        if not query:
-            raise HTTPException(status_code=400, detail="Query parameter is required")
-            
-        # Create a StreamRequest from query parameters
-        stream_request = StreamRequest(
-            query=query,
-            request_id=query_params.get("request_id", str(uuid.uuid4())),
-            session_id=query_params.get("session_id"),
-            model=query_params.get("model"),
-            language=query_params.get("language", "en"),
-            max_search_results=int(query_params.get("max_search_results", 5)),
-            temperature=float(query_params.get("temperature", 0.7)),
-            max_tokens=int(query_params.get("max_tokens", 4096)),
-            top_p=float(query_params.get("top_p", 0.9)),
-            top_k=int(query_params.get("top_k", 40)),
-            timeout=int(query_params.get("timeout", 300))
-        )
-    
-    # If no background_tasks was provided, create one
-    if background_tasks is None:
-        background_tasks = BackgroundTasks()
-    
-    request_id = stream_request.request_id or str(uuid.uuid4())
+    request_id = stream_request.request_id or new_id()
     session_id = stream_request.session_id or request_id
     
     # Track the stream
     active_streams[request_id] = {
         "start_time": time.time(),
         "session_id": session_id,
-        "query": stream_request.query,
-        "disconnected": False
+        "query": stream_request.query
     }
     
-    logger.info(f"[{request_id}] Unified endpoint called with query: {stream_request.query}")
+    logger.info("[%s] Unified endpoint called with query: %s", request_id, stream_request.query)
     
     # Add a background task to clean up this stream when done
     background_tasks.add_task(lambda: active_streams.pop(request_id, None))
@@ -251,45 +288,60 @@ async def unified_endpoint(request: Request, stream_request: StreamRequest = Non
     async def generate_unified_stream():
         """Generate the unified SSE stream with search results and LLM response."""
         
+        # Bind the per-stream envelope fields once
+        _rid = request_id
+        _sid = session_id
+        
+        # Bind hot callables as locals so the chunk loop skips global/attribute lookups
+        _time = time.time
+        _dumps = orjson.dumps
+        _timestamp = _sse_timestamp
+        _is_disconnected = request.is_disconnected
+        
         # Helper function to format SSE messages
-        def format_sse(event_type: str, data: Any, metadata: Dict[str, Any] = None) -> str:
+        def format_sse(event_type: str, data: Any, metadata: Dict[str, Any] = None) -> bytes:
             message = {
                 "type": event_type,
                 "data": data,
-                "request_id": request_id,
-                "session_id": session_id,
-                "timestamp": datetime.now().isoformat()
+                "request_id": _rid,
+                "session_id": _sid,
+                "timestamp": _timestamp()
             }
             
             if metadata:
                 message["metadata"] = metadata
                 
-            return f"data: {json.dumps(message)}\n\n"
+            return b"data: " + _dumps(message) + b"\n\n"
+        
+        # Warm up the model and fetch answer cache candidates while the search runs,
+        # without holding back the search results
+        warm_task = asyncio.create_task(warm_ollama(request.app.state.ollama))
+        cache_task = asyncio.create_task(answer_cache.lookup_by_query(stream_request.query))
         
         try:
             # 1. Initial status message
             yield format_sse("status", "Processing query", {"step": "init"})
             
-            # Helper function to check if client disconnected
-            def is_disconnected():
-                return request_id in active_streams and active_streams[request_id].get("disconnected", False)
-            
             # 2. Search phase
             yield format_sse("status", "Searching the web...", {"step": "search_start"})
-            search_start = time.time()
+            search_start = _time()
             
             try:
                 # Perform the search
-                search_results = await search_serper(stream_request.query, timeout=30.0)
-                search_time = time.time() - search_start
+                search_results = await search_serper(
+                    stream_request.query,
+                    client=request.app.state.http,
+                    timeout=30.0
+                )
+                search_time = _time() - search_start
                 
-                if is_disconnected():
-                    logger.info(f"[{request_id}] Client disconnected during search")
+                if await _is_disconnected():
+                    logger.info("[%s] Client disconnected during search", request_id)
                     return
                 
                 # Log search completion
                 organic_count = len(search_results.get('organic', []))
-                logger.info(f"[{request_id}] Search completed in {search_time:.2f}s with {organic_count} results")
+                logger.info("[%s] Search completed in %.2fs with %d results", request_id, search_time, organic_count)
                 
                 # Stream search status
                 yield format_sse("status", "Search completed", {
@@ -298,24 +350,16 @@ async def unified_endpoint(request: Request, stream_request: StreamRequest = Non
                     "result_count": organic_count
                 })
                 
-                # Stream search results (limited to max_search_results)
+                # Send search results (limited to max_search_results) as a single event
                 if search_results.get('organic'):
                     max_results = min(stream_request.max_search_results, len(search_results['organic']))
                     
-                    for idx, result in enumerate(search_results['organic'][:max_results]):
-                        if is_disconnected():
-                            return
-                            
-                        yield format_sse("search_result", result, {
-                            "position": idx + 1,
-                            "total": max_results
-                        })
-                        
-                        # Small delay between results for UI rendering
-                        await asyncio.sleep(0.05)
+                    yield format_sse("search_results", search_results['organic'][:max_results], {
+                        "total": max_results
+                    })
                 
             except Exception as e:
-                logger.error(f"[{request_id}] Search error: {str(e)}")
+                logger.error("[%s] Search error: %s", request_id, e)
                 yield format_sse("error", f"Search error: {str(e)}", {
                     "step": "search_error",
                     "error_type": type(e).__name__
@@ -325,11 +369,29 @@ async def unified_endpoint(request: Request, stream_request: StreamRequest = Non
                 search_results = {"organic": []}
             
             # 3. LLM generation phase
-            if is_disconnected():
+            if await _is_disconnected():
                 return
                 
             yield format_sse("status", "Generating answer...", {"step": "generation_start"})
-            generation_start = time.time()
+            generation_start = _time()
+            
+            # Check the answer cache first, a hit needs neither the model nor the warm-up.
+            # A slow or failed prefetch counts as a miss ({} keeps generation from looking up again)
+            try:
+                cache_candidates = await asyncio.wait_for(cache_task, timeout=CACHE_PREFETCH_WAIT)
+            except Exception as e:
+                logger.warning("[%s] Answer cache prefetch failed: %r", request_id, e)
+                cache_candidates = {}
+            
+            if answer_cache.results_hash(search_results) in cache_candidates:
+                logger.info("[%s] Answer cache hit", request_id)
+                warm_task.cancel()
+            else:
+                # Give the warm-up a short head start; generation loads the model anyway
+                try:
+                    await asyncio.wait_for(warm_task, timeout=WARMUP_WAIT)
+                except Exception as e:
+                    logger.debug("[%s] Model warm-up not finished: %r", request_id, e)
             
             try:
                 # Prepare LLM parameters
@@ -349,26 +411,27 @@ async def unified_endpoint(request: Request, stream_request: StreamRequest = Non
                 async for chunk in generate_answer_streaming(
                     stream_request.query,
                     search_results,
+                    client=request.app.state.ollama,
                     max_iterations=MAX_LLM_ITERATIONS,
-                    timeout=stream_request.timeout
+                    timeout=stream_request.timeout,
+                    cache_candidates=cache_candidates
                 ):
-                    if is_disconnected():
-                        logger.info(f"[{request_id}] Client disconnected during generation")
+                    if await _is_disconnected():
+                        logger.info("[%s] Client disconnected during generation", request_id)
                         return
                     
                     if chunk:
                         has_content = True
                         chunk_count += 1
-                        total_tokens += len(chunk.split())
+                        # Approximate word count without allocating a list per chunk
+                        approx_tokens = chunk.count(" ") + 1
+                        total_tokens += approx_tokens
                         
                         yield format_sse("answer_chunk", chunk, {
                             "step": "generation_chunk",
                             "chunk_id": chunk_count,
-                            "tokens": len(chunk.split())
+                            "tokens": approx_tokens
                         })
-                        
-                        # Add a small delay between chunks to prevent overwhelming the client
-                        await asyncio.sleep(0.01)
                 
                 # If no content was generated, provide a fallback
                 if not has_content:
@@ -376,8 +439,8 @@ async def unified_endpoint(request: Request, stream_request: StreamRequest = Non
                     yield format_sse("answer_chunk", fallback, {"step": "fallback"})
                 
                 # Generation complete
-                generation_time = time.time() - generation_start
-                logger.info(f"[{request_id}] Generation completed in {generation_time:.2f}s, {total_tokens} tokens, {chunk_count} chunks")
+                generation_time = _time() - generation_start
+                logger.info("[%s] Generation completed in %.2fs, %d tokens, %d chunks", request_id, generation_time, total_tokens, chunk_count)
                 
                 yield format_sse("status", "Generation completed successfully", {
                     "step": "generation_complete",
@@ -388,8 +451,8 @@ async def unified_endpoint(request: Request, stream_request: StreamRequest = Non
                 })
                 
             except Exception as e:
-                logger.error(f"[{request_id}] Generation error: {str(e)}")
-                logger.error(f"[{request_id}] Traceback: {traceback.format_exc()}")
+                logger.error("[%s] Generation error: %s", request_id, e)
+                logger.error("[%s] Traceback: %s", request_id, traceback.format_exc())
                 
                 yield format_sse("error", f"Generation error: {str(e)}", {
                     "step": "generation_error",
@@ -401,27 +464,31 @@ async def unified_endpoint(request: Request, stream_request: StreamRequest = Non
                 yield format_sse("answer_chunk", fallback, {"step": "fallback"})
             
             # 4. Complete the stream
-            total_time = time.time() - search_start
+            total_time = _time() - search_start
             yield format_sse("status", "Request completed", {
                 "step": "complete",
                 "total_time": total_time
             })
             
             # End of stream marker
-            yield "data: [DONE]\n\n"
+            yield DONE_FRAME
             
         except Exception as e:
-            logger.error(f"[{request_id}] Unhandled exception in unified stream: {str(e)}")
-            logger.error(f"[{request_id}] Traceback: {traceback.format_exc()}")
+            logger.error("[%s] Unhandled exception in unified stream: %s", request_id, e)
+            logger.error("[%s] Traceback: %s", request_id, traceback.format_exc())
             
             try:
                 yield format_sse("error", f"Unhandled error: {str(e)}", {
                     "step": "fatal_error",
                     "error_type": type(e).__name__
                 })
-                yield "data: [DONE]\n\n"
+                yield DONE_FRAME
             except:
                 pass
+        finally:
+            # Stop the side tasks if the stream ended early (e.g. client disconnect)
+            warm_task.cancel()
+            cache_task.cancel()
     
     # Return the streaming response
     return StreamingResponse(
@@ -439,32 +506,16 @@ async def unified_endpoint(request: Request, stream_request: StreamRequest = Non
     )
 
 # Cleanup task to remove old entries from the cache
-@router.on_event("startup")
-async def setup_cache_cleanup():
-    """Set up background task to clean up the search cache periodically."""
-    async def cleanup_cache():
-        while True:
-            try:
-                # Sleep for 30 minutes
-                await asyncio.sleep(30 * 60)
-                
-                # Get current time
-                now = datetime.now()
-                
-                # Remove entries older than 2 hours
-                keys_to_remove = []
-                for key, value in search_cache.items():
-                    timestamp = datetime.fromisoformat(value["timestamp"])
-                    if (now - timestamp).total_seconds() > 2 * 60 * 60:  # 2 hours in seconds
-                        keys_to_remove.append(key)
-                
-                # Remove the old entries
-                for key in keys_to_remove:
-                    del search_cache[key]
-                    
-                logger.info(f"Cache cleanup: removed {len(keys_to_remove)} old entries")
-            except Exception as e:
-                logger.error(f"Error in cache cleanup: {str(e)}")
-    
-    # Start the background task
-    asyncio.create_task(cleanup_cache()) 
\ No newline at end of file
+async def cleanup_cache():
+    """
+    Clean up search cache entries that are too old.
+    Sleeps until the oldest entry is due instead of polling.
+    """
+    while True:
+        try:
+            # Sleep until the oldest entry is due to expire
+            await search_cache.wait_for_expiry()
+            removed = search_cache.expire()
+            logger.info("Cache cleanup: removed %d old entries", removed)
+        except Exception as e:
+            logger.error("Error in cache cleanup: %s", e)
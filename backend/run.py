@@ -15,5 +15,7 @@ if __name__ == "__main__":
         port=settings.PORT, 
         reload=settings.DEBUG,
         timeout_keep_alive=120,
-        log_level="info"
+        log_level="info",
+        loop=settings.UVICORN_LOOP,
+        http=settings.UVICORN_HTTP
     ) 
\ No newline at end of file
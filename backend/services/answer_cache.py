@@ -0,0 +1,312 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import orjson
+from typing import Dict, Any, Union, Optional, List, Set
+
+from config import settings
+from models import SearchResult
+
+# Embedding-based lookup is optional: without these packages the cache still
+# serves exact (query, results) repeats from SQLite
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+# Number of nearest neighbours checked against the results hash on lookup
+_SEARCH_K = 5
+
+# Seconds between writes of unsaved index changes to disk (plus one on shutdown)
+_PERSIST_INTERVAL = 60
+
+# Recent query embeddings kept so store() reuses the one computed on lookup
+_EMBED_CACHE_SIZE = 256
+
+# Bump when STATIC_SYSTEM or the user block format in llm_service changes, so
+# answers generated from the old prompt are no longer served
+PROMPT_VERSION = 1
+
+class AnswerCache:
+    """
+    Semantic cache for LLM answers.
+
+    An entry is a hit when the query embedding has cosine similarity
+    >= settings.ANSWER_CACHE_THRESHOLD with a cached query AND the results
+    hash matches, so a similar question asked over different sources (or
+    answered by another model or prompt version) is never served from the cache.
+
+    Answers are stored in SQLite (WAL mode) and query embeddings in a FAISS
+    inner-product index whose ids are the SQLite row ids. Entries expire after
+    settings.ANSWER_CACHE_TTL and the oldest are dropped beyond
+    settings.ANSWER_CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir: Directory holding answers.sqlite and answers.faiss
+        """
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, "answers.sqlite")
+        self.index_path = os.path.join(cache_dir, "answers.faiss")
+        self._lock = threading.Lock()
+        # Serializes index writes so an older snapshot never replaces a newer one
+        self._persist_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._model = None
+        self._index = None
+        self._unsaved = 0
+        self._embed = functools.lru_cache(maxsize=_EMBED_CACHE_SIZE)(self._encode)
+
+    def _ensure_open(self) -> None:
+        """Open the database, embedding model and index on first use."""
+        if self._db is not None:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+
+            # AUTOINCREMENT never reuses a row id, since an index file saved before
+            # a crash may still hold ids of deleted rows
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, query TEXT NOT NULL, "
+                "results_hash TEXT NOT NULL, answer TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS answers_exact ON answers (query, results_hash)")
+            db.execute("CREATE INDEX IF NOT EXISTS answers_created ON answers (created_at)")
+            db.commit()
+        except Exception:
+            db.close()
+            raise
+
+        if faiss is not None:
+            try:
+                self._model = SentenceTransformer(settings.ANSWER_CACHE_MODEL)
+                if os.path.exists(self.index_path):
+                    self._index = faiss.read_index(self.index_path)
+                else:
+                    dim = self._model.get_sentence_embedding_dimension()
+                    self._index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+            except Exception as e:
+                # Fall back for good instead of retrying the model load (or download) on every call
+                logger.warning("Answer cache embeddings unavailable, using exact matches only: %s", e)
+                self._model = None
+                self._index = None
+        else:
+            logger.info("faiss/sentence-transformers not installed, answer cache uses exact matches only")
+
+        self._db = db
+
+    def _encode(self, query: str):
+        """Return the normalized embedding of a query as a (1, dim) float32 array."""
+        vector = self._model.encode([query], normalize_embeddings=True)
+        return np.asarray(vector, dtype="float32")
+
+    def candidates_sync(self, query: str) -> Dict[str, str]:
+        """Blocking implementation of lookup_by_query()."""
+        with self._lock:
+            self._ensure_open()
+            key = _normalize_query(query)
+            cutoff = time.time() - settings.ANSWER_CACHE_TTL
+            candidates: Dict[str, str] = {}
+
+            if self._index is not None and self._index.ntotal > 0:
+                scores, ids = self._index.search(self._embed(key), _SEARCH_K)
+                row_ids = [
+                    int(row_id) for score, row_id in zip(scores[0], ids[0])
+                    if row_id != -1 and score >= settings.ANSWER_CACHE_THRESHOLD
+                ]
+                if row_ids:
+                    placeholders = ",".join("?" * len(row_ids))
+                    rows = self._db.execute(
+                        f"SELECT results_hash, answer FROM answers "
+                        f"WHERE id IN ({placeholders}) AND created_at >= ?",
+                        (*row_ids, cutoff)
+                    ).fetchall()
+                    candidates.update(rows)
+
+            # Exact query matches take precedence over similar ones
+            rows = self._db.execute(
+                "SELECT results_hash, answer FROM answers WHERE query = ? AND created_at >= ?",
+                (key, cutoff)
+            ).fetchall()
+            candidates.update(rows)
+            return candidates
+
+    def store_sync(self, query: str, results_hash: str, answer: str) -> None:
+        """Blocking implementation of store()."""
+        with self._lock:
+            self._ensure_open()
+            key = _normalize_query(query)
+
+            cursor = self._db.execute(
+                "INSERT INTO answers (query, results_hash, answer, created_at) VALUES (?, ?, ?, ?)",
+                (key, results_hash, answer, time.time())
+            )
+            if self._index is not None:
+                ids = np.asarray([cursor.lastrowid], dtype="int64")
+                self._index.add_with_ids(self._embed(key), ids)
+                self._unsaved += 1
+
+            self._prune()
+            self._db.commit()
+
+    def _prune(self) -> None:
+        """Delete expired entries and the oldest ones beyond the size limit (lock held)."""
+        stale = [row_id for (row_id,) in self._db.execute(
+            "SELECT id FROM answers WHERE created_at < ? "
+            "UNION SELECT id FROM (SELECT id FROM answers ORDER BY created_at DESC, id DESC LIMIT -1 OFFSET ?)",
+            (time.time() - settings.ANSWER_CACHE_TTL, settings.ANSWER_CACHE_MAX_ENTRIES)
+        )]
+        if not stale:
+            return
+
+        placeholders = ",".join("?" * len(stale))
+        self._db.execute(f"DELETE FROM answers WHERE id IN ({placeholders})", stale)
+        if self._index is not None:
+            self._index.remove_ids(np.asarray(stale, dtype="int64"))
+            self._unsaved += 1
+
+    def flush_sync(self) -> None:
+        """Write unsaved index changes to disk."""
+        with self._persist_lock:
+            # Snapshot under the lock, write outside it so lookups are not blocked
+            with self._lock:
+                if self._index is None or not self._unsaved:
+                    return
+                data = faiss.serialize_index(self._index)
+                self._unsaved = 0
+
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data.tobytes())
+            os.replace(tmp_path, self.index_path)
+
+def _normalize_query(query: str) -> str:
+    """Normalize a query for exact-match keys and embedding."""
+    return " ".join(query.lower().split())
+
+def results_hash(search_results: Union[Dict[Any, Any], SearchResult]) -> str:
+    """
+    Hash the inputs an answer depends on besides the query: the top 5 organic
+    results the prompt is built from, the model and the prompt version.
+
+    Args:
+        search_results: The search results from Serper.dev (either as Dict or SearchResult)
+
+    Returns:
+        Hex SHA-1 digest of the canonical JSON of those inputs
+    """
+    if isinstance(search_results, SearchResult):
+        organic: List[Dict[str, Any]] = search_results.organic[:5]
+    else:
+        organic = search_results.get("organic", [])[:5]
+    key = {"model": settings.OLLAMA_MODEL, "prompt_version": PROMPT_VERSION, "organic": organic}
+    return hashlib.sha1(orjson.dumps(key, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+_cache = AnswerCache(settings.ANSWER_CACHE_DIR)
+
+# Stores scheduled by store_in_background(), referenced until they finish
+_pending: Set[asyncio.Task] = set()
+
+async def lookup_by_query(query: str) -> Dict[str, str]:
+    """
+    Fetch the cached answers for a query (and similar queries) before the
+    search results are known, so the embedding cost can overlap the search.
+    Pick the hit with candidates.get(results_hash(search_results)).
+
+    Args:
+        query: The original search query
+
+    Returns:
+        Mapping of results hash to cached answer (empty on a miss, or if the
+        cache is disabled or fails)
+    """
+    if not settings.ANSWER_CACHE_ENABLED:
+        return {}
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _cache.candidates_sync, query)
+    except Exception as e:
+        logger.warning("Answer cache lookup failed: %s", e)
+        return {}
+
+async def lookup(query: str, search_results: Union[Dict[Any, Any], SearchResult]) -> Optional[str]:
+    """
+    Look up a cached answer for a query and its search results.
+
+    Args:
+        query: The original search query
+        search_results: The search results the answer would be built from
+
+    Returns:
+        The cached answer, or None on a miss (or if the cache is disabled or fails)
+    """
+    candidates = await lookup_by_query(query)
+    if not candidates:
+        return None
+    return candidates.get(results_hash(search_results))
+
+async def store(query: str, search_results: Union[Dict[Any, Any], SearchResult], answer: str) -> None:
+    """
+    Store a generated answer for a query and its search results.
+
+    Args:
+        query: The original search query
+        search_results: The search results the answer was built from
+        answer: The generated answer
+    """
+    if not settings.ANSWER_CACHE_ENABLED:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _cache.store_sync, query, results_hash(search_results), answer)
+    except Exception as e:
+        logger.warning("Answer cache store failed: %s", e)
+
+def store_in_background(query: str, search_results: Union[Dict[Any, Any], SearchResult], answer: str) -> None:
+    """
+    Schedule store() without waiting for it, so the caller can finish its
+    response first. flush() waits for pending stores on shutdown.
+
+    Args:
+        query: The original search query
+        search_results: The search results the answer was built from
+        answer: The generated answer
+    """
+    if not settings.ANSWER_CACHE_ENABLED:
+        return
+    task = asyncio.ensure_future(store(query, search_results, answer))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+async def persist_periodically() -> None:
+    """Write unsaved index changes every _PERSIST_INTERVAL seconds (started from the app lifespan)."""
+    while True:
+        await asyncio.sleep(_PERSIST_INTERVAL)
+        await flush()
+
+async def flush() -> None:
+    """Wait for pending stores, then write unsaved index changes to disk."""
+    if _pending:
+        # asyncio.wait (unlike gather) leaves the stores running if this is cancelled
+        await asyncio.wait(set(_pending))
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _cache.flush_sync)
+    except Exception as e:
+        logger.warning("Answer cache flush failed: %s", e)
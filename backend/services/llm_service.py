@@ -1,13 +1,46 @@
 import httpx
-import json
+import orjson
 import asyncio
+import functools
+import hashlib
+import logging
+import re
 from fastapi import HTTPException
-from typing import Dict, Any, Union, Optional, AsyncGenerator
+from typing import Dict, Any, List, Union, Optional, AsyncGenerator
 
 from config import settings
 from models import SearchResult
+from services import answer_cache
 
-async def generate_answer(query: str, search_results: Union[Dict[Any, Any], SearchResult]) -> str:
+logger = logging.getLogger(__name__)
+
+# Size of the pieces a cached answer is streamed in
+CACHED_CHUNK_SIZE = 40
+
+# Headers for request bodies pre-serialized with orjson
+JSON_HEADERS = {"content-type": "application/json"}
+
+# Phrases that indicate the LLM has naturally finished its answer, including
+# the special "END OF RESPONSE" completion token from the prompt
+_COMPLETION_RE = re.compile(
+    r"in conclusion|to summarize|in summary|thank you for your question|i hope this helps|end of response",
+    re.IGNORECASE
+)
+
+# Trailing characters kept to catch completion phrases split across chunks
+_COMPLETION_TAIL = 64
+
+# Token the prompt asks the model to finish with; it is stripped from the output
+END_TOKEN = "END OF RESPONSE"
+
+# Trailing characters kept to catch an end token split across chunks
+_END_TOKEN_OVERLAP = len(END_TOKEN) - 1
+
+async def generate_answer(
+    query: str,
+    search_results: Union[Dict[Any, Any], SearchResult],
+    client: httpx.AsyncClient
+) -> str:
     """
     Generate an answer using the local LLM (Ollama) based on search results.
     Optimized for handling longer, more complex queries.
@@ -15,6 +48,7 @@ async def generate_answer(query: str, search_results: Union[Dict[Any, Any], Sear
     Args:
         query: The original search query
         search_results: The search results from Serper.dev (either as Dict or SearchResult)
+        client: Shared HTTP client bound to the Ollama API (see http_clients.py)
         
     Returns:
         Generated answer from the LLM
@@ -22,25 +56,24 @@ async def generate_answer(query: str, search_results: Union[Dict[Any, Any], Sear
     Raises:
         HTTPException: If there's an error with the LLM API request
     """
-    # Ensure search_results is a dictionary
-    if isinstance(search_results, SearchResult):
-        search_results_dict = dict(search_results)
-    else:
-        search_results_dict = search_results
+    # Serve repeated or similar queries over the same results from the cache
+    cached = await answer_cache.lookup(query, search_results)
+    if cached is not None:
+        return cached
     
-    # Format the prompt with search results
-    prompt = format_optimized_prompt(query, search_results_dict)
+    # Format the per-request prompt; the static instructions go in "system"
+    prompt = build_user_block(query, search_results)
     
-    # Use the direct Ollama API URL - ensure no path duplication
-    api_url = settings.OLLAMA_API_URL
-    if not api_url.endswith("/api/generate"):
-        api_url = f"{api_url}/api/generate"
+    # The shared client is bound to settings.OLLAMA_API_URL
+    api_url = "/api/generate"
     
     # Set generation parameters optimized for llama3:8b
     payload = {
         "model": settings.OLLAMA_MODEL,
+        "system": STATIC_SYSTEM,
         "prompt": prompt,
         "stream": False,
+        "keep_alive": settings.OLLAMA_KEEP_ALIVE,
         "options": {
             "num_predict": 1024,
             "temperature": 0.7,
@@ -50,55 +83,57 @@ async def generate_answer(query: str, search_results: Union[Dict[Any, Any], Sear
     }
     
     try:
-        # Print debug information
-        print(f"Sending request to Ollama at: {api_url}")
-        print(f"Using model: {settings.OLLAMA_MODEL}")
-        print(f"Payload length: {len(prompt)} characters")
-        print(f"Payload preview: {prompt[:100]}...")  # Only print the first 100 chars
+        logger.debug("Sending request to Ollama at: %s%s", settings.OLLAMA_API_URL, api_url)
+        logger.debug("Using model: %s", settings.OLLAMA_MODEL)
+        logger.debug("Payload length: %s characters", len(prompt))
+        logger.debug("Payload preview: %.100s...", prompt)  # Only log the first 100 chars
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                api_url,
-                json=payload,
-                timeout=300.0  # Increased timeout for longer queries
-            )
-            
-            # Check if the request was successful
-            response.raise_for_status()
-            
-            result = response.json()
-            answer = result.get("response", "")
-            
-            # Check if we got a valid answer
-            if not answer or len(answer.strip()) < 10:
-                return fallback_answer(query)
-                
-            return answer
+        response = await client.post(
+            api_url,
+            content=orjson.dumps(payload),
+            headers=JSON_HEADERS,
+            timeout=300.0  # Increased timeout for longer queries
+        )
+        
+        # Check if the request was successful
+        response.raise_for_status()
+        
+        result = orjson.loads(response.content)
+        answer = result.get("response", "")
+        
+        # Check if we got a valid answer
+        if not answer or len(answer.strip()) < 10:
+            return fallback_answer(query)
             
+        answer_cache.store_in_background(query, search_results, answer)
+        return answer
+        
     except httpx.HTTPStatusError as e:
         error_detail = f"LLM API error: {str(e)}"
-        print(f"HTTP Status Error: {error_detail}")
-        print(f"Response content: {e.response.text}")
+        logger.error("HTTP Status Error: %s", error_detail)
+        logger.debug("Response content: %s", e.response.text)
         if e.response.status_code == 404:
-            error_detail = f"LLM API error: Model '{settings.OLLAMA_MODEL}' not found or Ollama server not running at {api_url}"
+            error_detail = f"LLM API error: Model '{settings.OLLAMA_MODEL}' not found or Ollama server not running at {settings.OLLAMA_API_URL}"
         # Return fallback answer instead of raising exception
         return fallback_answer(query)
     except httpx.RequestError as e:
         error_detail = f"LLM request error: {str(e)}"
-        print(f"Request Error: {error_detail}")
+        logger.error("Request Error: %s", error_detail)
         # Return fallback answer instead of raising exception
         return fallback_answer(query)
     except Exception as e:
         error_detail = f"Unexpected LLM error: {str(e)}"
-        print(f"Unexpected Error: {error_detail}")
+        logger.exception("Unexpected Error: %s", error_detail)
         # Return fallback answer instead of raising exception
         return fallback_answer(query)
 
 async def generate_answer_streaming(
     query: str, 
     search_results: Union[Dict[Any, Any], SearchResult], 
+    client: httpx.AsyncClient,
     max_iterations: int = 100,
-    timeout: int = None
+    timeout: int = None,
+    cache_candidates: Optional[Dict[str, str]] = None
 ) -> AsyncGenerator[str, None]:
     """
     Generate an answer using the local LLM (Ollama) with streaming support.
@@ -107,8 +142,11 @@ async def generate_answer_streaming(
     Args:
         query: The original search query
         search_results: The search results from Serper.dev
+        client: Shared HTTP client bound to the Ollama API (see http_clients.py)
         max_iterations: Maximum number of iterations (chunks) to generate
         timeout: Timeout in seconds for the LLM API call
+        cache_candidates: Answer cache candidates prefetched with
+            answer_cache.lookup_by_query; looked up here if not given
         
     Yields:
         Chunks of the generated answer as they become available
@@ -116,25 +154,30 @@ async def generate_answer_streaming(
     # Use provided timeout or fall back to config value
     timeout = timeout or settings.OLLAMA_TIMEOUT
     
-    # Ensure search_results is a dictionary
-    if isinstance(search_results, SearchResult):
-        search_results_dict = dict(search_results)
+    # Serve repeated or similar queries over the same results from the cache,
+    # chunked to preserve the streaming contract
+    if cache_candidates is not None:
+        cached = cache_candidates.get(answer_cache.results_hash(search_results))
     else:
-        search_results_dict = search_results
+        cached = await answer_cache.lookup(query, search_results)
+    if cached is not None:
+        for start in range(0, len(cached), CACHED_CHUNK_SIZE):
+            yield cached[start:start + CACHED_CHUNK_SIZE]
+        return
     
-    # Format the prompt with search results
-    prompt = format_optimized_prompt(query, search_results_dict)
+    # Format the per-request prompt; the static instructions go in "system"
+    prompt = build_user_block(query, search_results)
     
-    # Use the direct Ollama API URL - ensure no path duplication
-    api_url = settings.OLLAMA_API_URL
-    if not api_url.endswith("/api/generate"):
-        api_url = f"{api_url}/api/generate"
+    # The shared client is bound to settings.OLLAMA_API_URL
+    api_url = "/api/generate"
     
     # Set generation parameters optimized for complete responses
     payload = {
         "model": settings.OLLAMA_MODEL,
+        "system": STATIC_SYSTEM,
         "prompt": prompt,
         "stream": True,
+        "keep_alive": settings.OLLAMA_KEEP_ALIVE,
         "options": {
             "num_predict": settings.OLLAMA_MAX_TOKENS,  # Use the configured max tokens
             "temperature": 0.7,
@@ -145,132 +188,167 @@ async def generate_answer_streaming(
     }
     
     try:
-        # Print debug information
-        print(f"Sending streaming request to Ollama at: {api_url}")
-        print(f"Using model: {settings.OLLAMA_MODEL}")
-        print(f"Max tokens: {settings.OLLAMA_MAX_TOKENS}")
-        print(f"Timeout: {timeout} seconds")
-        print(f"Payload length: {len(prompt)} characters")
+        logger.debug("Sending streaming request to Ollama at: %s%s", settings.OLLAMA_API_URL, api_url)
+        logger.debug("Using model: %s", settings.OLLAMA_MODEL)
+        logger.debug("Max tokens: %s", settings.OLLAMA_MAX_TOKENS)
+        logger.debug("Timeout: %s seconds", timeout)
+        logger.debug("Payload length: %s characters", len(prompt))
         
         # Track if we've received any valid chunks
         has_yielded = False
-        buffer = ""
+        has_text = False  # Whether any non-whitespace text was yielded
+        generated = []  # Everything yielded, stored in the answer cache on success
         iterations = 0
-        end_token = "END OF RESPONSE"
         
-        # Track completion indicators
-        completion_indicators = [
-            "In conclusion", 
-            "To summarize", 
-            "In summary",
-            "Thank you for your question",
-            "I hope this helps",
-            end_token  # Special completion token from the prompt
-        ]
+        # Recent output checked for a split end token and for completion indicators
+        end_token_tail = ""
+        completion_tail = ""
         
         # Create a flag to track if we've detected a natural completion
         natural_completion_detected = False
         
-        # Set timeout for streaming responses
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            try:
-                async with client.stream("POST", api_url, json=payload) as response:
-                    response.raise_for_status()
-                    print(f"LLM streaming response status: {response.status_code}")
-                    
-                    # Process the streaming response
-                    async for chunk in response.aiter_text():
-                        try:
-                            # Each chunk is a JSON object with a "response" field
-                            print(f"Raw LLM chunk: {chunk[:50]}...")
-                            data = json.loads(chunk)
+        try:
+            async with client.stream(
+                "POST",
+                api_url,
+                content=orjson.dumps(payload),
+                headers=JSON_HEADERS,
+                timeout=timeout
+            ) as response:
+                response.raise_for_status()
+                logger.debug("LLM streaming response status: %s", response.status_code)
+                
+                # Process the streaming response (NDJSON, one object per line)
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        # Each line is a JSON object with a "response" field
+                        data = orjson.loads(line)
+                        
+                        # Check for done flag
+                        if data.get("done", False):
+                            logger.debug("Received 'done' flag from LLM")
+                            break
                             
-                            # Check for done flag
-                            if data.get("done", False):
-                                print("Received 'done' flag from LLM")
-                                break
+                        if "response" in data:
+                            text_chunk = data["response"]
+                            if text_chunk:  # Only yield non-empty chunks
+                                # Check for the end token, which may be split across chunks,
+                                # against a fixed-size tail of the output so far
+                                end_probe = end_token_tail + text_chunk
+                                end_token_pos = end_probe.find(END_TOKEN)
                                 
-                            if "response" in data:
-                                text_chunk = data["response"]
-                                if text_chunk:  # Only yield non-empty chunks
-                                    # Update buffer with new chunk to check for end token
-                                    # that might be split across chunks
-                                    temp_buffer = buffer + text_chunk
-                                    
-                                    # Check if buffer now contains our special completion token
-                                    end_token_pos = temp_buffer.find(end_token)
-                                    
-                                    if end_token_pos != -1:
-                                        # If we found the end token, only yield the text up to that point
-                                        print(f"Found {end_token} token, truncating response")
-                                        if end_token_pos > 0:
-                                            final_chunk = temp_buffer[:end_token_pos].strip()
-                                            # Only yield if there's something new (not already in buffer)
-                                            if len(final_chunk) > len(buffer):
-                                                yield final_chunk[len(buffer):]
+                                if end_token_pos != -1:
+                                    # If we found the end token, only yield the text up to that point
+                                    logger.debug("Found %s token, truncating response", END_TOKEN)
+                                    final_chunk = text_chunk[:max(end_token_pos - len(end_token_tail), 0)].rstrip()
+                                    # Only yield if this chunk has text before the token
+                                    if final_chunk:
+                                        generated.append(final_chunk)
+                                        yield final_chunk
+                                    natural_completion_detected = True
+                                    break
+                                
+                                if logger.isEnabledFor(logging.DEBUG):
+                                    logger.debug("Yielding chunk: %.50s...", text_chunk)
+                                end_token_tail = end_probe[-_END_TOKEN_OVERLAP:]
+                                has_text = has_text or not text_chunk.isspace()
+                                has_yielded = True
+                                generated.append(text_chunk)
+                                yield text_chunk
+                                
+                                # Check for natural completion indicators in the recent output only
+                                probe = completion_tail + text_chunk
+                                if not natural_completion_detected:
+                                    match = _COMPLETION_RE.search(probe)
+                                    if match:
+                                        logger.debug("Natural completion indicator detected: %s", match.group(0))
                                         natural_completion_detected = True
-                                        break
-                                    
-                                    print(f"Yielding chunk: {text_chunk[:50]}...")
-                                    buffer = temp_buffer
-                                    has_yielded = True
-                                    yield text_chunk
-                                    
-                                    # Check for natural completion indicators
-                                    for indicator in completion_indicators:
-                                        if indicator.lower() in buffer.lower():
-                                            print(f"Natural completion indicator detected: {indicator}")
-                                            natural_completion_detected = True
+                                completion_tail = probe[-_COMPLETION_TAIL:]
+                                
+                                # Increment iteration counter and check max
+                                iterations += 1
+                                if iterations >= max_iterations:
+                                    logger.debug("Reached maximum iterations (%s), stopping generation", max_iterations)
                                     
-                                    # Increment iteration counter and check max
-                                    iterations += 1
-                                    if iterations >= max_iterations:
-                                        print(f"Reached maximum iterations ({max_iterations}), stopping generation")
+                                    # If we've reached max iterations but haven't detected a natural completion,
+                                    # add a closing sentence to make the response feel complete
+                                    if not natural_completion_detected:
+                                        closing = "\n\nI hope this information addresses your question. Let me know if you need further clarification."
+                                        generated.append(closing)
+                                        yield closing
                                         
-                                        # If we've reached max iterations but haven't detected a natural completion,
-                                        # add a closing sentence to make the response feel complete
-                                        if not natural_completion_detected:
-                                            closing = "\n\nI hope this information addresses your question. Let me know if you need further clarification."
-                                            yield closing
-                                            
-                                        break
-                        except json.JSONDecodeError as e:
-                            print(f"Error decoding JSON chunk: {e} - Raw chunk: {chunk[:50]}...")
-                            # Skip malformed chunks
-                            continue
-                
-                # Check if the response feels incomplete
-                if has_yielded and not natural_completion_detected and iterations < max_iterations:
-                    print("Response may be incomplete, adding closing sentence")
-                    closing = "\n\nI hope this information addresses your question. Let me know if you need further clarification."
-                    yield closing
-                    
-            except httpx.HTTPStatusError as e:
-                print(f"HTTP error during streaming: {e.response.status_code} - {str(e)}")
-                print(f"Response content: {e.response.text}")
-                # Don't raise, we'll handle with fallback
-            except httpx.RequestError as e:
-                print(f"Request error during streaming: {str(e)}")
-                # Don't raise, we'll handle with fallback
+                                    break
+                    except orjson.JSONDecodeError as e:
+                        logger.warning("Error decoding JSON line: %s - Raw line: %.50s...", e, line)
+                        # Skip malformed chunks
+                        continue
+            
+            # Check if the response feels incomplete
+            if has_yielded and not natural_completion_detected and iterations < max_iterations:
+                logger.debug("Response may be incomplete, adding closing sentence")
+                closing = "\n\nI hope this information addresses your question. Let me know if you need further clarification."
+                generated.append(closing)
+                yield closing
             
-            # If we didn't get any valid response, yield a fallback
-            if not has_yielded or not buffer.strip():
-                print("No valid response received from LLM, using fallback")
-                fallback = fallback_answer(query)
-                yield fallback
+            # The stream finished without errors, cache the full answer
+            # without holding up the end of the stream
+            if has_text:
+                answer_cache.store_in_background(query, search_results, "".join(generated))
                 
+        except httpx.HTTPStatusError as e:
+            logger.error("HTTP error during streaming: %s - %s", e.response.status_code, e)
+            logger.debug("Response content: %s", e.response.text)
+            # Don't raise, we'll handle with fallback
+        except httpx.RequestError as e:
+            logger.error("Request error during streaming: %s", e)
+            # Don't raise, we'll handle with fallback
+        
+        # If we didn't get any valid response, yield a fallback
+        if not has_text:
+            logger.warning("No valid response received from LLM, using fallback")
+            fallback = fallback_answer(query)
+            yield fallback
+            
     except Exception as e:
-        print(f"Error in streaming generation: {str(e)}")
+        logger.exception("Error in streaming generation: %s", e)
         fallback = fallback_answer(query)
-        print(f"Using fallback response: {fallback}")
+        logger.debug("Using fallback response: %s", fallback)
         yield fallback
     
     # Always ensure we yield something, even if everything else fails
     if not has_yielded:
         emergency_fallback = "I apologize, but I couldn't process your request at this time. Please try again later."
-        print(f"Using emergency fallback: {emergency_fallback}")
+        logger.warning("Using emergency fallback: %s", emergency_fallback)
         yield emergency_fallback
 
+async def warm_ollama(client: httpx.AsyncClient) -> None:
+    """
+    Load the model into Ollama ahead of generation.
+    An empty prompt only loads the model (pinned for settings.OLLAMA_KEEP_ALIVE),
+    so this can run while the search is in flight.
+    
+    Args:
+        client: Shared HTTP client bound to the Ollama API (see http_clients.py)
+    """
+    payload = {
+        "model": settings.OLLAMA_MODEL,
+        "prompt": "",
+        "keep_alive": settings.OLLAMA_KEEP_ALIVE
+    }
+    try:
+        response = await client.post(
+            "/api/generate",
+            content=orjson.dumps(payload),
+            headers=JSON_HEADERS,
+            timeout=settings.OLLAMA_TIMEOUT
+        )
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        # Generation reports its own errors, warm-up is best effort
+        logger.warning("Ollama warm-up failed: %s", e)
+
 def fallback_answer(query: str) -> str:
     """
     Provide a fallback answer when LLM generation fails.
@@ -283,88 +361,129 @@ def fallback_answer(query: str) -> str:
     """
     return f"I'm sorry, I couldn't generate a complete response for '{query}'. Please try a more specific question or check back later."
 
-def format_optimized_prompt(query: str, search_results: Dict[Any, Any]) -> str:
+# Static instructions sent in Ollama's "system" field. Keeping them out of the
+# per-request prompt lets Ollama reuse the cached prefix across requests.
+# Bump answer_cache.PROMPT_VERSION when changing the prompt.
+STATIC_SYSTEM = """You are an AI assistant that provides helpful, accurate, thorough, and complete answers based on search results.
+
+Your task is to analyze and synthesize the search results provided with the user's query to give a comprehensive answer to the user's question. 
+Focus on being accurate, detailed, dont explain it overexaggerated and complete in your response.
+
+INSTRUCTIONS:
+1. Provide a thorough and complete answer to the user's query.
+2. Structure your response with a clear beginning, middle, and conclusion.
+3. Include relevant facts, explanations, and context from the search results.
+4. If the information is not sufficient, acknowledge this limitation.
+5. Do not include phrases like "Based on the search results" or "According to the information provided" in your answer.
+6. Write in a helpful, informative tone.
+7. Always finish your response with a proper conclusion or summary.
+8. Make sure your answer is complete and doesn't cut off mid-explanation.
+9. End your response with the phrase "END OF RESPONSE" to indicate you have finished.
+
+Remember: Your goal is to provide a complete, well-structured answer that fully addresses the user's question.
+"""
+
+# Static text around the per-request part of the prompt
+USER_HEADER_TEMPLATE = "USER QUERY: {query}\n\n"
+USER_FOOTER = "Begin your response now:\n"
+
+def _trunc(text: str, limit: int) -> str:
+    """Truncate text to at most limit characters, marking the cut with "..."."""
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+class _PromptInputs:
+    """
+    The part of the search results a prompt is built from, hashable by digest
+    so it can be an lru_cache key (the results themselves are plain dicts).
+    """
+    __slots__ = ("digest", "organic", "answer_box")
+
+    def __init__(self, organic: List[Dict[str, Any]], answer_box: Dict[str, Any]):
+        self.organic = organic
+        self.answer_box = answer_box
+        self.digest = hashlib.blake2b(
+            orjson.dumps(organic + [answer_box], option=orjson.OPT_SORT_KEYS),
+            digest_size=16
+        ).digest()
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _PromptInputs) and self.digest == other.digest
+
+def _get(search_results: Union[Dict[Any, Any], SearchResult], key: str, default: Any = None) -> Any:
+    """Read a field from either a results dict or a SearchResult without copying it."""
+    if isinstance(search_results, SearchResult):
+        return getattr(search_results, key, default)
+    return search_results.get(key, default)
+
+def build_user_block(query: str, search_results: Union[Dict[Any, Any], SearchResult]) -> str:
     """
-    Format an optimized prompt for the LLM using the search results.
-    Enhanced to encourage complete, thorough responses.
+    Build the per-request part of the prompt: the query and search results.
+    The static instructions are sent separately as STATIC_SYSTEM.
+    
+    Repeated (query, results) pairs, e.g. a retried query, are served from an
+    LRU cache, which also keeps the prompt byte-identical for Ollama's prompt cache.
     
     Args:
         query: The original search query
-        search_results: The search results from Serper.dev
+        search_results: The search results from Serper.dev (either as Dict or SearchResult)
         
     Returns:
-        Formatted prompt string
+        Formatted user prompt string
     """
-    # Build the prompt with clear instructions
-    prompt = f"""You are an AI assistant that provides helpful, accurate, thorough, and complete answers based on search results.
-
-USER QUERY: {query}
-
-Your task is to analyze and synthesize the following search results to provide a comprehensive answer to the user's question. 
-Focus on being accurate, detailed, dont explain it overexaggerated and complete in your response.
-
-"""
-    
     # Extract organic search results and limit to top 5
-    organic_results = search_results.get("organic", [])[:5]  # Limit to top 5 results
+    organic_results = (_get(search_results, "organic") or [])[:5]  # Limit to top 5 results
     
-    # Extract answer box if available
-    answer_box = search_results.get("answerBox", {})
-    if not answer_box and "answerBox" not in search_results:
-        # Try alternate key format
-        answer_box = search_results.get("answer_box", {})
+    # Extract answer box if available (falling back to the alternate key format)
+    answer_box = _get(search_results, "answerBox") or _get(search_results, "answer_box") or {}
+    
+    return _format_cached(query, _PromptInputs(organic_results, answer_box))
+
+@functools.lru_cache(maxsize=512)
+def _format_cached(query: str, inputs: _PromptInputs) -> str:
+    """Format the user block for build_user_block(), memoized on (query, results digest)."""
+    parts = [USER_HEADER_TEMPLATE.format(query=query)]
+    answer_box = inputs.answer_box
     
     # Add answer box information if available
     if answer_box:
-        prompt += "FEATURED ANSWER:\n"
+        parts.append("FEATURED ANSWER:\n")
+        # Truncate to ~500 characters (increased from 300)
         if "answer" in answer_box:
-            # Truncate to ~500 characters (increased from 300)
-            answer = answer_box["answer"]
-            if len(answer) > 500:
-                answer = answer[:497] + "..."
-            prompt += f"{answer}\n\n"
+            parts.append(f"{_trunc(answer_box['answer'], 500)}\n\n")
         elif "snippet" in answer_box:
-            # Truncate to ~500 characters (increased from 300)
-            snippet = answer_box["snippet"]
-            if len(snippet) > 500:
-                snippet = snippet[:497] + "..."
-            prompt += f"{snippet}\n\n"
+            parts.append(f"{_trunc(answer_box['snippet'], 500)}\n\n")
     
     # Add organic search results
-    prompt += "SEARCH RESULTS:\n"
+    parts.append("SEARCH RESULTS:\n")
     
-    for i, result in enumerate(organic_results, 1):
-        title = result.get("title", "No Title")
-        
+    for i, result in enumerate(inputs.organic, 1):
         # Truncate snippet to ~400 characters (increased from 300)
-        snippet = result.get("snippet", "No Snippet")
-        if len(snippet) > 400:
-            snippet = snippet[:397] + "..."
-            
-        link = result.get("link", "No Link")
-        
-        prompt += f"{i}. {title}\n"
-        prompt += f"   {snippet}\n"
-        prompt += f"   Source: {link}\n\n"
+        parts.append(
+            f"{i}. {result.get('title', 'No Title')}\n"
+            f"   {_trunc(result.get('snippet', 'No Snippet'), 400)}\n"
+            f"   Source: {result.get('link', 'No Link')}\n\n"
+        )
     
-    # Add final instruction with emphasis on completeness
-    prompt += """INSTRUCTIONS:
-1. Provide a thorough and complete answer to the user's query.
-2. Structure your response with a clear beginning, middle, and conclusion.
-3. Include relevant facts, explanations, and context from the search results.
-4. If the information is not sufficient, acknowledge this limitation.
-5. Do not include phrases like "Based on the search results" or "According to the information provided" in your answer.
-6. Write in a helpful, informative tone.
-7. Always finish your response with a proper conclusion or summary.
-8. Make sure your answer is complete and doesn't cut off mid-explanation.
-9. End your response with the phrase "END OF RESPONSE" to indicate you have finished.
-
-Remember: Your goal is to provide a complete, well-structured answer that fully addresses the user's question.
+    parts.append(USER_FOOTER)
+    
+    return "".join(parts)
 
-Begin your response now:
-"""
+def format_optimized_prompt(query: str, search_results: Union[Dict[Any, Any], SearchResult]) -> str:
+    """
+    Format a single self-contained prompt (system instructions + user block)
+    for callers that cannot use Ollama's separate "system" field.
     
-    return prompt 
+    Args:
+        query: The original search query
+        search_results: The search results from Serper.dev
+        
+    Returns:
+        Formatted prompt string
+    """
+    return f"{STATIC_SYSTEM}\n{build_user_block(query, search_results)}"
 
 def format_prompt(query: str, search_results: Dict[Any, Any]) -> str:
     """
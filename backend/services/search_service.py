@@ -1,17 +1,21 @@
 import httpx
-import json
+import orjson
 import time
+import logging
 from fastapi import HTTPException
 from typing import Dict, Any
 
 from config import settings
 
-async def search_serper(query: str, timeout: float = 60.0) -> Dict[Any, Any]:
+logger = logging.getLogger(__name__)
+
+async def search_serper(query: str, client: httpx.AsyncClient, timeout: float = 60.0) -> Dict[Any, Any]:
     """
     Send a search query to Serper.dev API and return results.
     
     Args:
         query: The search query string
+        client: Shared HTTP client used to send the request
         timeout: Timeout in seconds for the request
         
     Returns:
@@ -32,53 +36,54 @@ async def search_serper(query: str, timeout: float = 60.0) -> Dict[Any, Any]:
     }
     
     try:
-        print(f"Sending search request to Serper.dev for query: {query}")
-        print(f"Using API key: {settings.SERPER_API_KEY[:5]}...{settings.SERPER_API_KEY[-5:]}")
-        print(f"Serper.dev API URL: {settings.SERPER_API_URL}")
-        print(f"Request timeout: {timeout} seconds")
+        logger.debug("Sending search request to Serper.dev for query: %s", query)
+        logger.debug("Using API key: %.5s...%s", settings.SERPER_API_KEY, settings.SERPER_API_KEY[-5:])
+        logger.debug("Serper.dev API URL: %s", settings.SERPER_API_URL)
+        logger.debug("Request timeout: %s seconds", timeout)
         
-        async with httpx.AsyncClient() as client:
-            print("Sending request to Serper.dev...")
-            start_time = time.time()
-            
-            response = await client.post(
-                settings.SERPER_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=timeout
-            )
-            
-            elapsed = time.time() - start_time
-            print(f"Search request completed in {elapsed:.2f} seconds")
-            print(f"Response status code: {response.status_code}")
-            
-            # Check if the request was successful
-            response.raise_for_status()
-            
-            # Return the search results
-            result = response.json()
-            print(f"Search completed successfully with {len(result.get('organic', []))} organic results")
-            
-            # Log some details about the results
+        logger.debug("Sending request to Serper.dev...")
+        start_time = time.time()
+        
+        response = await client.post(
+            settings.SERPER_API_URL,
+            headers=headers,
+            content=orjson.dumps(payload),
+            timeout=timeout
+        )
+        
+        elapsed = time.time() - start_time
+        logger.debug("Search request completed in %.2f seconds", elapsed)
+        logger.debug("Response status code: %s", response.status_code)
+        
+        # Check if the request was successful
+        response.raise_for_status()
+        
+        # Return the search results
+        result = orjson.loads(response.content)
+        logger.debug("Search completed successfully with %s organic results", len(result.get('organic', [])))
+        
+        # Log some details about the results
+        if logger.isEnabledFor(logging.DEBUG):
             if 'organic' in result and len(result['organic']) > 0:
-                print(f"First result title: {result['organic'][0].get('title', 'No title')}")
-                print(f"First result link: {result['organic'][0].get('link', 'No link')}")
-                print(f"First result snippet preview: {result['organic'][0].get('snippet', 'No snippet')[:100]}...")
-            
+                logger.debug("First result title: %s", result['organic'][0].get('title', 'No title'))
+                logger.debug("First result link: %s", result['organic'][0].get('link', 'No link'))
+                logger.debug("First result snippet preview: %.100s...", result['organic'][0].get('snippet', 'No snippet'))
+        
             if 'answerBox' in result and result['answerBox']:
-                print("Answer box found in results")
+                logger.debug("Answer box found in results")
                 if 'answer' in result['answerBox']:
-                    print(f"Answer box content: {result['answerBox']['answer'][:100]}...")
+                    logger.debug("Answer box content: %.100s...", result['answerBox']['answer'])
                 elif 'snippet' in result['answerBox']:
-                    print(f"Answer box snippet: {result['answerBox']['snippet'][:100]}...")
-            
-            print(f"Total result size: {len(json.dumps(result))} bytes")
-            return result
-            
+                    logger.debug("Answer box snippet: %.100s...", result['answerBox']['snippet'])
+        
+            logger.debug("Total result size: %s bytes", len(response.content))
+        
+        return result
+        
     except httpx.HTTPStatusError as e:
-        print(f"HTTP Status Error in search: {str(e)}")
-        print(f"Response status code: {e.response.status_code if hasattr(e, 'response') else 'Unknown'}")
-        print(f"Response content: {e.response.text if hasattr(e, 'response') else 'No response'}")
+        logger.error("HTTP Status Error in search: %s", e)
+        logger.debug("Response status code: %s", e.response.status_code if hasattr(e, 'response') else 'Unknown')
+        logger.debug("Response content: %s", e.response.text if hasattr(e, 'response') else 'No response')
         
         if hasattr(e, 'response') and e.response.status_code == 403:
             raise HTTPException(
@@ -90,19 +95,17 @@ async def search_serper(query: str, timeout: float = 60.0) -> Dict[Any, Any]:
             detail=f"Search API error: {str(e)}"
         )
     except httpx.RequestError as e:
-        print(f"Request Error in search: {str(e)}")
-        print(f"Error type: {type(e).__name__}")
+        logger.error("Request Error in search: %s", e)
+        logger.debug("Error type: %s", type(e).__name__)
         if isinstance(e, httpx.TimeoutException):
-            print("Request timed out")
+            logger.debug("Request timed out")
             raise HTTPException(status_code=504, detail=f"Search request timed out after {timeout} seconds")
         elif isinstance(e, httpx.ConnectError):
-            print("Connection error")
+            logger.debug("Connection error")
             raise HTTPException(status_code=503, detail="Could not connect to search API")
         else:
             raise HTTPException(status_code=500, detail=f"Request error: {str(e)}")
     except Exception as e:
-        print(f"Unexpected error in search: {str(e)}")
-        print(f"Error type: {type(e).__name__}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Unexpected error in search: %s", e)
+        logger.debug("Error type: %s", type(e).__name__)
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from config import settings
+from services import answer_cache
+
+QUERY = "What is the capital of France?"
+RESULTS = {"organic": [{"title": "Paris", "snippet": "Paris is the capital of France.", "link": "https://example.com/paris"}]}
+OTHER_RESULTS = {"organic": [{"title": "Lyon", "snippet": "Lyon is a city in France.", "link": "https://example.com/lyon"}]}
+ANSWER = "The capital of France is Paris."
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    """Use a fresh SQLite-only cache in a temporary directory."""
+    monkeypatch.setattr(answer_cache, "faiss", None)
+    monkeypatch.setattr(answer_cache, "_cache", answer_cache.AnswerCache(str(tmp_path)))
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", True)
+    return answer_cache._cache
+
+def store(query=QUERY, results=RESULTS, answer=ANSWER):
+    asyncio.run(answer_cache.store(query, results, answer))
+
+def lookup(query=QUERY, results=RESULTS):
+    return asyncio.run(answer_cache.lookup(query, results))
+
+def test_hit():
+    store()
+    assert lookup() == ANSWER
+
+def test_hit_ignores_case_and_whitespace():
+    store()
+    assert lookup("  what is the CAPITAL of france? ") == ANSWER
+
+def test_miss():
+    store()
+    assert lookup("What is the capital of Spain?") is None
+
+def test_results_mismatch():
+    store()
+    assert lookup(results=OTHER_RESULTS) is None
+
+def test_model_change(monkeypatch):
+    store()
+    monkeypatch.setattr(settings, "OLLAMA_MODEL", "another-model")
+    assert lookup() is None
+
+def test_prompt_version_change(monkeypatch):
+    store()
+    monkeypatch.setattr(answer_cache, "PROMPT_VERSION", answer_cache.PROMPT_VERSION + 1)
+    assert lookup() is None
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", False)
+    store()
+    assert lookup() is None
+
+    # Nothing was written while disabled
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", True)
+    assert lookup() is None
+
+def test_expired(monkeypatch):
+    store()
+    now = time.time()
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now + settings.ANSWER_CACHE_TTL + 1)
+    assert lookup() is None
+
+def test_max_entries(monkeypatch):
+    monkeypatch.setattr(settings, "ANSWER_CACHE_MAX_ENTRIES", 2)
+    store("first query")
+    store("second query")
+    store("third query")
+    assert lookup("first query") is None
+    assert lookup("second query") == ANSWER
+    assert lookup("third query") == ANSWER
+
+def test_lookup_by_query_keys_on_results_hash():
+    store(results=RESULTS, answer="from results")
+    store(results=OTHER_RESULTS, answer="from other results")
+    candidates = asyncio.run(answer_cache.lookup_by_query(QUERY))
+    assert candidates == {
+        answer_cache.results_hash(RESULTS): "from results",
+        answer_cache.results_hash(OTHER_RESULTS): "from other results",
+    }
+
+def test_store_in_background():
+    async def run():
+        answer_cache.store_in_background(QUERY, RESULTS, ANSWER)
+        await answer_cache.flush()
+        return await answer_cache.lookup(QUERY, RESULTS)
+    assert asyncio.run(run()) == ANSWER
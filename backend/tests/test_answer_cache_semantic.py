@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+faiss = pytest.importorskip("faiss")
+np = pytest.importorskip("numpy")
+
+from config import settings
+from services import answer_cache
+
+RESULTS = {"organic": [{"title": "Paris", "snippet": "Paris is the capital of France.", "link": "https://example.com/paris"}]}
+OTHER_RESULTS = {"organic": [{"title": "Lyon", "snippet": "Lyon is a city in France.", "link": "https://example.com/lyon"}]}
+ANSWER = "The capital of France is Paris."
+
+# Queries sharing these words embed to the same direction
+VOCABULARY = ["capital", "france", "spain", "weather"]
+
+class StubEmbedder:
+    """Bag-of-words stand-in for SentenceTransformer."""
+
+    def __init__(self, name):
+        pass
+
+    def get_sentence_embedding_dimension(self):
+        return len(VOCABULARY)
+
+    def encode(self, queries, normalize_embeddings=True):
+        words = queries[0].replace("?", "").split()
+        vector = np.asarray([[float(word in words) for word in VOCABULARY]], dtype="float32")
+        return vector / max(np.linalg.norm(vector), 1e-6)
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    """Use a fresh cache with a real FAISS index and a stub embedder."""
+    monkeypatch.setattr(answer_cache, "faiss", faiss)
+    monkeypatch.setattr(answer_cache, "np", np, raising=False)
+    monkeypatch.setattr(answer_cache, "SentenceTransformer", StubEmbedder, raising=False)
+    monkeypatch.setattr(answer_cache, "_cache", answer_cache.AnswerCache(str(tmp_path)))
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "ANSWER_CACHE_THRESHOLD", 0.95)
+    return answer_cache._cache
+
+def store(query, results=RESULTS, answer=ANSWER):
+    asyncio.run(answer_cache.store(query, results, answer))
+
+def lookup(query, results=RESULTS):
+    return asyncio.run(answer_cache.lookup(query, results))
+
+def test_similar_query_hit():
+    store("What is the capital of France?")
+    assert lookup("france capital") == ANSWER
+
+def test_below_threshold_miss():
+    store("What is the capital of France?")
+    # Shares "capital" only: cosine 0.5
+    assert lookup("capital of spain") is None
+
+def test_similar_query_results_mismatch():
+    store("What is the capital of France?")
+    assert lookup("france capital", results=OTHER_RESULTS) is None
+
+def test_prune_removes_vectors(cache, monkeypatch):
+    monkeypatch.setattr(settings, "ANSWER_CACHE_MAX_ENTRIES", 2)
+    store("capital of france")
+    store("capital of spain")
+    store("weather in spain")
+    assert cache._index.ntotal == 2
+    assert lookup("france capital") is None
+    assert lookup("spain capital") == ANSWER
+
+def test_index_persist_and_reload(cache, tmp_path):
+    store("What is the capital of France?")
+    cache.flush_sync()
+
+    reloaded = answer_cache.AnswerCache(str(tmp_path))
+    assert reloaded.candidates_sync("france capital") == {answer_cache.results_hash(RESULTS): ANSWER}
+    assert reloaded._index.ntotal == 1
+
+def test_store_reuses_lookup_embedding(cache, monkeypatch):
+    encoded = []
+    encode = StubEmbedder.encode
+
+    def counting_encode(self, queries, **kwargs):
+        encoded.append(queries[0])
+        return encode(self, queries, **kwargs)
+
+    monkeypatch.setattr(StubEmbedder, "encode", counting_encode)
+    store("capital of france")
+    lookup("capital of spain")
+    store("capital of spain")
+    assert encoded == ["capital of france", "capital of spain"]
+
+def test_embedder_failure_falls_back_to_exact_matches(monkeypatch):
+    calls = []
+
+    def failing_model(name):
+        calls.append(name)
+        raise OSError("model not available offline")
+
+    monkeypatch.setattr(answer_cache, "SentenceTransformer", failing_model, raising=False)
+    store("What is the capital of France?")
+    assert lookup("What is the capital of France?") == ANSWER
+    assert lookup("france capital") is None
+    # The model load is attempted once, not on every call
+    assert len(calls) == 1
@@ -0,0 +1,115 @@
+import asyncio
+import heapq
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+class TTLStore:
+    """
+    Dict-like store whose entries expire after a fixed time-to-live.
+
+    Expiry times are kept in a min-heap, so a cleanup pass only touches
+    entries that are actually due instead of scanning the whole dict, and
+    the cleanup task can sleep until the next expiry instead of polling.
+    """
+
+    def __init__(self, ttl: float):
+        """
+        Args:
+            ttl: Default time-to-live in seconds for new entries
+        """
+        self.ttl = ttl
+        self._data: Dict[Any, Any] = {}
+        self._expires_at: Dict[Any, float] = {}
+        self._heap: List[Tuple[float, Any]] = []
+        # Created inside the running loop by each wait_for_expiry() call
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Insert or replace an entry.
+
+        Args:
+            key: Entry key
+            value: Entry value
+            ttl: Time-to-live in seconds, defaults to the store's ttl
+        """
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._data[key] = value
+        self._expires_at[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+
+        # Wake the cleanup task early if this entry is now the next to expire
+        if self._wakeup is not None and self._heap[0][0] == expires_at:
+            self._wakeup.set()
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        Remove all entries whose expiry time has passed.
+
+        Args:
+            now: Reference timestamp, defaults to time.time()
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time() if now is None else now
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            # Skip heap entries left behind by keys that were replaced or popped
+            if self._expires_at.get(key) != expires_at:
+                continue
+            del self._data[key]
+            del self._expires_at[key]
+            removed += 1
+        return removed
+
+    async def wait_for_expiry(self) -> None:
+        """Sleep until the earliest entry is due to expire."""
+        # A fresh Event per call, so it is always bound to the current loop
+        # (an app lifespan may run more than once per process, e.g. in tests)
+        wakeup = self._wakeup = asyncio.Event()
+
+        while True:
+            wakeup.clear()
+            if self._heap:
+                delay = self._heap[0][0] - time.time()
+                if delay <= 0:
+                    return
+            else:
+                # Nothing to expire, sleep until an entry is inserted
+                delay = None
+
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                return
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        self._expires_at.pop(key, None)
+        return self._data.pop(key, default)
+
+    def items(self):
+        return self._data.items()
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.set(key, value)
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._data[key]
+
+    def __delitem__(self, key: Any) -> None:
+        del self._data[key]
+        del self._expires_at[key]
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)